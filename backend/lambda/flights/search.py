@@ -5,66 +5,517 @@ Optimized for Chilean flight search patterns
 
 import json
 import boto3
+import hashlib
+import orjson
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+import redis
 import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import logging
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-class FlightSearchService:
-    def __init__(self):
-        self.db_secret_name = os.environ.get('DB_SECRET_NAME', 'vuelachile/db-password')
-        self.region_name = os.environ.get('AWS_REGION', 'us-east-1')
-        
-        # Initialize AWS clients
-        self.secrets_client = boto3.client('secretsmanager', region_name=self.region_name)
-        self.elasticache_client = boto3.client('elasticache', region_name=self.region_name)
-        
-        # Cache configuration
-        self.cache_ttl = 300  # 5 minutes cache for flight searches
-        
-        # Database connection
-        self.db_connection = None
+DB_SECRET_NAME = os.environ.get('DB_SECRET_NAME', 'vuelachile/db-password')
+REGION_NAME = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Parsed credentials are reused for up to an hour. After that the secret is
+# read again and the pool is rebuilt if it changed, so rotations are picked
+# up; the AWS Parameters and Secrets Lambda Extension serves them from a
+# local cache when its layer is attached
+DB_CREDS_TTL = 3600
+SECRETS_EXTENSION_PORT = os.environ.get('PARAMETERS_SECRETS_EXTENSION_HTTP_PORT')
+
+# Pool sizing, tuned per function to match its provisioned concurrency
+DB_POOL_MIN_CONN = int(os.environ.get('DB_POOL_MIN_CONN', '2'))
+DB_POOL_MAX_CONN = int(os.environ.get('DB_POOL_MAX_CONN', '5'))
+
+# Longest the container init waits on the pool warm-up, well inside the 10 s
+# Lambda init budget; a slower warm-up finishes in the background
+DB_WARM_UP_TIMEOUT = 4
+
+# Chilean IVA (19%) multiplier applied to economy fares
+_IVA = 1.19
+
+# Bits of the search shape mask, one per filter a search can apply
+_FROM_AIRPORT = 1 << 0
+_TO_AIRPORT = 1 << 1
+_DEPARTURE_DATE = 1 << 2
+_PASSENGERS = 1 << 3
+_MAX_PRICE = 1 << 4
+_DIRECT_ONLY = 1 << 5
+_AIRLINE = 1 << 6
+_TIME_PREFERENCE = 1 << 7
+_AFTER = 1 << 8
+_SEARCH_SHAPES = 1 << 9
+
+# Time preferences as inclusive departure hour ranges
+_TIME_BUCKETS = {
+    'morning': (6, 12),
+    'afternoon': (12, 18),
+    'evening': (18, 23)
+}
+
+# Flights per search page; further pages are fetched with a keyset cursor
+SEARCH_PAGE_SIZE = 50
+
+# Search response schema: v2 returns one flat dict per flight
+SEARCH_SCHEMA_VERSION = 2
+
+# Selected search columns and the flat response field each one fills; IVA and
+# the availability class are computed by Postgres during the scan. Prices are
+# cast to float8 so psycopg2's C float typecaster decodes them, with no Python
+# callback or Decimal per value
+_SEARCH_COLUMNS = (
+    ('f.flight_id', 'flight_id'),
+    ('al.airline_name', 'airline_name'),
+    ('al.baggage_allowance', 'baggage_allowance'),
+    ('al.cancellation_policy', 'cancellation_policy'),
+    ('f.flight_number', 'flight_number'),
+    ("ac.manufacturer || ' ' || ac.model", 'aircraft'),
+    ('dep.airport_code', 'departure_airport'),
+    ('dep.city_name', 'departure_city'),
+    ('f.departure_time', 'departure_time'),
+    ('arr.airport_code', 'arrival_airport'),
+    ('arr.city_name', 'arrival_city'),
+    ('f.arrival_time', 'arrival_time'),
+    ('f.flight_duration', 'duration'),
+    ('f.stops', 'stops'),
+    ('fp.price_economy::float8', 'price_economy'),
+    ('fp.price_premium::float8', 'price_premium'),
+    ('fp.price_business::float8', 'price_business'),
+    (f'(fp.price_economy * {_IVA})::float8', 'price_economy_with_tax'),
+    ('f.available_seats', 'available_seats'),
+    ('f.total_seats', 'total_seats'),
+    ("""CASE
+                WHEN f.available_seats = 0 THEN 'sold_out'
+                WHEN f.available_seats <= f.total_seats * 0.1 THEN 'limited'
+                WHEN f.available_seats <= f.total_seats * 0.3 THEN 'moderate'
+                ELSE 'available'
+            END""", 'booking_class')
+)
+_SEARCH_FIELDS = tuple(field for _, field in _SEARCH_COLUMNS)
+
+# Read-through cache (ElastiCache Redis); caching is disabled when unset
+REDIS_ENDPOINT = os.environ.get('REDIS_ENDPOINT')
+SEARCH_CACHE_TTL = 300  # 5 minutes cache for flight searches
+POPULAR_ROUTES_CACHE_TTL = 3600
+PRICE_TRENDS_CACHE_TTL = 900
+
+# AWS clients, credentials, the database pool and the cache client live at
+# module scope so warm invocations of the same execution environment reuse them
+_SECRETS = boto3.client('secretsmanager', region_name=REGION_NAME)
+
+_CREDS_CACHE: Dict[str, Any] = {'value': None, 'fetched_at': 0.0}
+_POOL: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+# Credentials the pool connects with and when they were last checked
+_POOL_STATE: Dict[str, Any] = {'credentials': None, 'checked_at': 0.0}
+# Serializes pool creation between the handler and executor threads
+_POOL_LOCK = threading.Lock()
+_SERVICE = None
+
+# Runs independent queries of one request side by side on separate pooled
+# connections, so their database round trips overlap
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+if REDIS_ENDPOINT:
+    _redis_host, _, _redis_port = REDIS_ENDPOINT.partition(':')
+    _REDIS: Optional[redis.Redis] = redis.Redis(
+        host=_redis_host,
+        port=int(_redis_port or 6379),
+        ssl=os.environ.get('REDIS_TLS', 'false').lower() == 'true',
+        socket_connect_timeout=0.5,
+        socket_timeout=0.5
+    )
+else:
+    _REDIS = None
+
+
+def _fetch_secret_string(secret_id: str) -> str:
+    """Read a secret through the Lambda extension when attached, else from Secrets Manager"""
+    if SECRETS_EXTENSION_PORT:
+        try:
+            request = urllib.request.Request(
+                f"http://localhost:{SECRETS_EXTENSION_PORT}/secretsmanager/get"
+                f"?secretId={urllib.parse.quote(secret_id, safe='')}",
+                headers={'X-Aws-Parameters-Secrets-Token': os.environ['AWS_SESSION_TOKEN']}
+            )
+            with urllib.request.urlopen(request, timeout=2) as response:
+                return json.loads(response.read())['SecretString']
+        except Exception as e:
+            logger.warning(f"Secrets extension unavailable, using Secrets Manager: {str(e)}")
     
-    def get_database_credentials(self) -> Dict[str, str]:
-        """Retrieve database credentials from AWS Secrets Manager"""
+    response = _SECRETS.get_secret_value(SecretId=secret_id)
+    return response['SecretString']
+
+
+def _get_database_credentials() -> Dict[str, str]:
+    """Retrieve database credentials, cached across warm invocations for DB_CREDS_TTL seconds"""
+    if (_CREDS_CACHE['value'] is None
+            or time.monotonic() - _CREDS_CACHE['fetched_at'] > DB_CREDS_TTL):
         try:
-            response = self.secrets_client.get_secret_value(SecretId=self.db_secret_name)
-            return json.loads(response['SecretString'])
+            _CREDS_CACHE['value'] = json.loads(_fetch_secret_string(DB_SECRET_NAME))
+            _CREDS_CACHE['fetched_at'] = time.monotonic()
         except Exception as e:
             logger.error(f"Error retrieving database credentials: {str(e)}")
             raise
     
-    def get_database_connection(self):
-        """Establish database connection with connection pooling"""
-        if self.db_connection is None or self.db_connection.closed:
-            try:
-                credentials = self.get_database_credentials()
-                
-                self.db_connection = psycopg2.connect(
-                    host=credentials['host'],
-                    port=credentials['port'],
-                    database=credentials['dbname'],
-                    user=credentials['username'],
-                    password=credentials['password'],
-                    sslmode='require',
-                    connect_timeout=10,
-                    application_name='vuelachile-flight-search'
-                )
+    return _CREDS_CACHE['value']
+
+
+class _SearchConnection(psycopg2.extensions.connection):
+    """Connection that remembers which search statements its session has prepared"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        # Searches only read, so statements run in autocommit and handing a
+        # connection back to the pool needs no ROLLBACK round trip
+        self.autocommit = True
+
+
+class _SearchPool(psycopg2.pool.ThreadedConnectionPool):
+    """Pool that can be replaced while other threads still hold its connections"""
+    
+    def __init__(self, *args, **kwargs):
+        self.retired = False
+        self._borrowed = 0
+        self._drain_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+    
+    def getconn(self, key=None):
+        with self._drain_lock:
+            self._borrowed += 1
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._returned()
+            raise
+    
+    def putconn(self, conn=None, key=None, close=False):
+        # A retired pool closes connections as they come back instead of keeping them
+        super().putconn(conn, key, close=close or self.retired)
+        self._returned()
+    
+    def retire(self):
+        """Stop reusing this pool; it closes once its last borrowed connection is back"""
+        with self._drain_lock:
+            self.retired = True
+            drained = self._borrowed == 0
+        if drained and not self.closed:
+            self.closeall()
+    
+    def _returned(self):
+        with self._drain_lock:
+            self._borrowed -= 1
+            drained = self.retired and self._borrowed == 0
+        if drained and not self.closed:
+            self.closeall()
+
+
+def _get_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    """
+    Return the container-wide connection pool, creating it on first use
+    The pool is rebuilt when the credentials changed after their TTL expired
+    """
+    global _POOL
+    
+    if (_POOL is not None and not _POOL.retired
+            and time.monotonic() - _POOL_STATE['checked_at'] <= DB_CREDS_TTL):
+        return _POOL
+    
+    with _POOL_LOCK:
+        # Another thread may have built or checked the pool while this one waited
+        if (_POOL is not None and not _POOL.retired
+                and time.monotonic() - _POOL_STATE['checked_at'] <= DB_CREDS_TTL):
+            return _POOL
+        
+        try:
+            credentials = _get_database_credentials()
+        except Exception:
+            if _POOL is not None and not _POOL.retired:
+                # Keep serving with the current pool; checked again on next use
+                return _POOL
+            raise
+        
+        if _POOL is not None and not _POOL.retired:
+            if credentials == _POOL_STATE['credentials']:
+                _POOL_STATE['checked_at'] = time.monotonic()
+                return _POOL
+            # Queries in flight on other threads finish on the old pool, which
+            # closes once they hand their connections back
+            logger.info("Database credentials changed, rebuilding connection pool")
+            _POOL.retire()
+        
+        try:
+            connect_kwargs = {}
+            # Set read-only for read replica if available
+            if os.environ.get('USE_READ_REPLICA', 'false').lower() == 'true':
+                connect_kwargs['options'] = '-c default_transaction_read_only=on'
+            
+            _POOL = _SearchPool(
+                minconn=DB_POOL_MIN_CONN,
+                maxconn=DB_POOL_MAX_CONN,
+                host=credentials['host'],
+                port=credentials['port'],
+                database=credentials['dbname'],
+                user=credentials['username'],
+                password=credentials['password'],
+                sslmode='require',
+                connect_timeout=10,
+                application_name='vuelachile-flight-search',
+                connection_factory=_SearchConnection,
+                **connect_kwargs
+            )
+            _POOL_STATE['credentials'] = credentials
+            _POOL_STATE['checked_at'] = time.monotonic()
                 
-                # Set read-only for read replica if available
-                if os.environ.get('USE_READ_REPLICA', 'false').lower() == 'true':
-                    self.db_connection.set_session(readonly=True)
-                    
-            except Exception as e:
-                logger.error(f"Database connection error: {str(e)}")
+        except Exception as e:
+            logger.error(f"Database connection error: {str(e)}")
+            raise
+        
+        return _POOL
+
+
+def _reset_pool(pool: psycopg2.pool.ThreadedConnectionPool):
+    """Retire pool and forget the cached credentials, so the next checkout reconnects with a fresh secret"""
+    global _POOL
+    
+    with _POOL_LOCK:
+        if _POOL is pool:
+            _CREDS_CACHE['value'] = None
+            _POOL.retire()
+            _POOL = None
+
+
+@contextmanager
+def _pooled_connection():
+    """Borrow a live connection from the pool and always hand it back"""
+    pool = _get_pool()
+    try:
+        try:
+            conn = pool.getconn()
+        except psycopg2.pool.PoolError:
+            if not pool.retired:
                 raise
+            # Retired and drained between lookup and checkout; use its replacement
+            pool = _get_pool()
+            conn = pool.getconn()
+        # Connections already known to be closed are replaced before use
+        while conn.closed:
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+    except psycopg2.OperationalError as e:
+        # New connections failing to authenticate usually mean the secret was
+        # rotated since the pool was built
+        if 'authentication failed' in str(e):
+            _reset_pool(pool)
+        raise
+    
+    discard = False
+    try:
+        yield conn
+    except psycopg2.OperationalError:
+        # Dropped sockets (idle/NAT timeouts, failover) surface on first use
+        # and leave the connection closed; it must not go back to the pool.
+        # Errors on a live connection, such as a statement timeout, keep it
+        discard = bool(conn.closed)
+        raise
+    finally:
+        pool.putconn(conn, close=discard)
+
+
+def _run_pooled(work: Callable[[_SearchConnection], Any]) -> Any:
+    """Run work on a pooled connection, retrying once on another connection if it was dead"""
+    conn = None
+    try:
+        with _pooled_connection() as conn:
+            return work(conn)
+    except psycopg2.OperationalError as e:
+        # Only a lost connection (or a failed checkout) is worth retrying;
+        # QueryCanceled from statement_timeout would just run the query twice
+        if conn is not None and not conn.closed:
+            raise
+        logger.warning(f"Database connection lost, retrying once: {str(e)}")
+        with _pooled_connection() as conn:
+            return work(conn)
+
+
+def warm_pool():
+    """Open the minimum pool connections and warm each server backend"""
+    pool = _get_pool()
+    connections = [pool.getconn() for _ in range(DB_POOL_MIN_CONN)]
+    try:
+        for conn in connections:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+    finally:
+        for conn in connections:
+            pool.putconn(conn)
+
+
+def _cache_key(prefix: str, params: Dict[str, Any]) -> str:
+    """Build a canonical cache key, independent of parameter order"""
+    payload = json.dumps(sorted(params.items()), default=str).encode()
+    return f"{prefix}:{hashlib.blake2b(payload, digest_size=16).hexdigest()}"
+
+
+def _cache_get(key: str) -> Any:
+    """Return the cached value for key, or None on a miss or cache failure"""
+    if _REDIS is None:
+        return None
+    
+    try:
+        cached = _REDIS.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {str(e)}")
+        return None
+    
+    return orjson.loads(cached) if cached is not None else None
+
+
+def _cache_set(key: str, ttl: int, value: Any):
+    """Store value under key for ttl seconds; cache failures are not fatal"""
+    if _REDIS is None:
+        return
+    
+    try:
+        _REDIS.setex(key, ttl, orjson.dumps(value, default=str, option=orjson.OPT_NAIVE_UTC))
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+
+def _compile_search_query(mask: int) -> Tuple[str, str, str, Tuple[str, ...]]:
+    """
+    Build the prepared search statement for one combination of filters
+    Returns the statement name, its PREPARE and EXECUTE SQL and the order of
+    the values bound to it
+    """
+    param_order = []
+    
+    def bind(name: str) -> str:
+        param_order.append(name)
+        return f"${len(param_order)}"
+    
+    # Origin and destination airports are resolved up front, so the flights
+    # scan starts from the route index instead of joining every flight to
+    # airports before filtering
+    dep_filter = f"WHERE airport_code = {bind('from_airport')}" if mask & _FROM_AIRPORT else ''
+    arr_filter = f"WHERE airport_code = {bind('to_airport')}" if mask & _TO_AIRPORT else ''
+    
+    conditions = ['1=1']
+    
+    # Departure date (and time preference) as a range on the bare
+    # departure_time column, so the route/time index and partition pruning
+    # apply; without a date the time preference can only filter by hour
+    if mask & _DEPARTURE_DATE:
+        conditions.append(
+            f"f.departure_time >= {bind('range_start')} AND f.departure_time < {bind('range_end')}"
+        )
+    elif mask & _TIME_PREFERENCE:
+        conditions.append(
+            f"EXTRACT(HOUR FROM f.departure_time) BETWEEN {bind('hour_start')} AND {bind('hour_end')}"
+        )
+    
+    if mask & _PASSENGERS:
+        conditions.append(f"f.available_seats >= {bind('passengers')}")
+    
+    if mask & _MAX_PRICE:
+        conditions.append(f"fp.price_economy <= {bind('max_price')}")
+    
+    if mask & _DIRECT_ONLY:
+        conditions.append("f.stops = 0")
+    
+    if mask & _AIRLINE:
+        conditions.append(f"al.airline_code = {bind('airline')}")
+    
+    # Keyset pagination: resume right after the last flight of the previous page
+    if mask & _AFTER:
+        conditions.append(
+            f"(fp.price_economy, fp.flight_id) > ({bind('after_price')}, {bind('after_flight_id')})"
+        )
+    
+    select_list = ',\n            '.join(f"{expression} as {field}" for expression, field in _SEARCH_COLUMNS)
+    
+    # Results are ordered by price, matching idx_flight_prices_economy so the
+    # scan can stop after one page instead of sorting every match
+    query = f"""
+        WITH dep AS MATERIALIZED (
+            SELECT airport_id, airport_code, city_name FROM airports {dep_filter}
+        ),
+        arr AS MATERIALIZED (
+            SELECT airport_id, airport_code, city_name FROM airports {arr_filter}
+        )
+        SELECT 
+            {select_list}
+        FROM flights f
+        JOIN dep ON f.departure_airport_id = dep.airport_id
+        JOIN arr ON f.arrival_airport_id = arr.airport_id
+        JOIN airlines al ON f.airline_id = al.airline_id
+        JOIN aircraft_types ac ON f.aircraft_type_id = ac.aircraft_id
+        JOIN flight_prices fp ON f.flight_id = fp.flight_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY 
+            fp.price_economy ASC,
+            fp.flight_id ASC
+        LIMIT {SEARCH_PAGE_SIZE}
+    """
+    
+    name = f"search_{mask}"
+    prepare_sql = f"PREPARE {name} AS {query}"
+    if param_order:
+        execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * len(param_order))})"
+    else:
+        execute_sql = f"EXECUTE {name}"
+    
+    return name, prepare_sql, execute_sql, tuple(param_order)
+
+
+# Every search shape is compiled once per container; a search only looks up
+# its statement by mask and binds values
+_SEARCH_QUERIES = {mask: _compile_search_query(mask) for mask in range(_SEARCH_SHAPES)}
+
+
+def _warm_up():
+    """Warm the pool, logging instead of raising; the first request retries lazily"""
+    try:
+        warm_pool()
+    except Exception as e:
+        logger.error(f"Database pool warm-up failed: {str(e)}")
+
+
+# Open and warm the pool during container init, outside the request path. The
+# secret read and DB_POOL_MIN_CONN serial connects can outlast the init budget
+# when the database is slow, so init only waits DB_WARM_UP_TIMEOUT seconds;
+# a first request arriving earlier waits on the pool lock instead
+_WARM_UP = threading.Thread(target=_warm_up, name='db-pool-warm-up', daemon=True)
+_WARM_UP.start()
+_WARM_UP.join(DB_WARM_UP_TIMEOUT)
+if _WARM_UP.is_alive():
+    logger.warning(f"Database pool warm-up still running after {DB_WARM_UP_TIMEOUT}s, continuing init")
+
+
+class FlightSearchService:
+    def __init__(self):
+        self.db_secret_name = DB_SECRET_NAME
+        self.region_name = REGION_NAME
         
-        return self.db_connection
+        # Shared AWS clients
+        self.secrets_client = _SECRETS
+    
+    def get_database_credentials(self) -> Dict[str, str]:
+        """Retrieve database credentials from AWS Secrets Manager"""
+        return _get_database_credentials()
     
     def search_flights(self, search_params: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -72,152 +523,78 @@ class FlightSearchService:
         Optimized for Chilean routes and preferences
         """
         try:
-            conn = self.get_database_connection()
-            cursor = conn.cursor()
+            # Versioned so entries cached in an older response shape are never served
+            cache_key = _cache_key(f'flights:v{SEARCH_SCHEMA_VERSION}', search_params)
+            cached_flights = _cache_get(cache_key)
+            if cached_flights is not None:
+                return cached_flights
             
-            # Build dynamic query based on search parameters
-            base_query = """
-                SELECT 
-                    f.flight_id,
-                    al.airline_name,
-                    f.flight_number,
-                    f.aircraft_type,
-                    dep_airport.airport_code as departure_airport,
-                    dep_airport.city_name as departure_city,
-                    arr_airport.airport_code as arrival_airport,
-                    arr_airport.city_name as arrival_city,
-                    f.departure_time,
-                    f.arrival_time,
-                    f.flight_duration,
-                    f.stops,
-                    fp.price_economy,
-                    fp.price_premium,
-                    fp.price_business,
-                    f.available_seats,
-                    f.total_seats,
-                    al.baggage_allowance,
-                    al.cancellation_policy
-                FROM flights f
-                JOIN airlines al ON f.airline_id = al.airline_id
-                JOIN airports dep_airport ON f.departure_airport_id = dep_airport.airport_id
-                JOIN airports arr_airport ON f.arrival_airport_id = arr_airport.airport_id
-                JOIN flight_prices fp ON f.flight_id = fp.flight_id
-                WHERE 1=1
-            """
-            
-            conditions = []
-            params = []
-            
-            # Origin airport
-            if search_params.get('from_airport'):
-                conditions.append("dep_airport.airport_code = %s")
-                params.append(search_params['from_airport'])
-            
-            # Destination airport
-            if search_params.get('to_airport'):
-                conditions.append("arr_airport.airport_code = %s")
-                params.append(search_params['to_airport'])
-            
-            # Departure date
-            if search_params.get('departure_date'):
-                conditions.append("DATE(f.departure_time) = %s")
-                params.append(search_params['departure_date'])
+            hours = _TIME_BUCKETS.get(search_params.get('time_preference'))
             
             # Return date for round trip
             if search_params.get('return_date') and search_params.get('trip_type') == 'roundtrip':
                 # This would require a more complex query or separate search
                 pass
             
-            # Passenger count
-            if search_params.get('passengers'):
-                conditions.append("f.available_seats >= %s")
-                params.append(search_params['passengers'])
-            
-            # Price range filter
-            if search_params.get('max_price'):
-                conditions.append("fp.price_economy <= %s")
-                params.append(search_params['max_price'])
-            
-            # Direct flights only
-            if search_params.get('direct_only'):
-                conditions.append("f.stops = 0")
-            
-            # Airline filter
-            if search_params.get('airline'):
-                conditions.append("al.airline_code = %s")
-                params.append(search_params['airline'])
-            
-            # Time preferences (morning, afternoon, evening)
-            if search_params.get('time_preference'):
-                time_pref = search_params['time_preference']
-                if time_pref == 'morning':
-                    conditions.append("EXTRACT(HOUR FROM f.departure_time) BETWEEN 6 AND 12")
-                elif time_pref == 'afternoon':
-                    conditions.append("EXTRACT(HOUR FROM f.departure_time) BETWEEN 12 AND 18")
-                elif time_pref == 'evening':
-                    conditions.append("EXTRACT(HOUR FROM f.departure_time) BETWEEN 18 AND 23")
-            
-            # Build final query
-            if conditions:
-                query = base_query + " AND " + " AND ".join(conditions)
-            else:
-                query = base_query
-            
-            # Add ordering - prioritize by price and departure time
-            query += """
-                ORDER BY 
-                    fp.price_economy ASC,
-                    f.departure_time ASC,
-                    f.stops ASC
-                LIMIT 50
-            """
-            
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            
-            # Format results
-            flights = []
-            for row in results:
-                flight = {
-                    'flight_id': row[0],
-                    'airline': {
-                        'name': row[1],
-                        'baggage_allowance': row[17],
-                        'cancellation_policy': row[18]
-                    },
-                    'flight_number': row[2],
-                    'aircraft': row[3],
-                    'departure': {
-                        'airport': row[4],
-                        'city': row[5],
-                        'time': row[8].isoformat() if row[8] else None
-                    },
-                    'arrival': {
-                        'airport': row[6],
-                        'city': row[7],
-                        'time': row[9].isoformat() if row[9] else None
-                    },
-                    'duration': str(row[10]) if row[10] else None,
-                    'stops': row[11],
-                    'pricing': {
-                        'economy': float(row[12]) if row[12] else None,
-                        'premium': float(row[13]) if row[13] else None,
-                        'business': float(row[14]) if row[14] else None
-                    },
-                    'available_seats': row[15],
-                    'total_seats': row[16],
-                    'booking_class': self.determine_booking_class(row[15], row[16])
-                }
+            # The filters present select one of the precompiled search shapes
+            mask = (
+                (_FROM_AIRPORT if search_params.get('from_airport') else 0)
+                | (_TO_AIRPORT if search_params.get('to_airport') else 0)
+                | (_DEPARTURE_DATE if search_params.get('departure_date') else 0)
+                | (_PASSENGERS if search_params.get('passengers') else 0)
+                | (_MAX_PRICE if search_params.get('max_price') else 0)
+                | (_DIRECT_ONLY if search_params.get('direct_only') else 0)
+                | (_AIRLINE if search_params.get('airline') else 0)
+                | (_TIME_PREFERENCE if hours else 0)
+                | (_AFTER if search_params.get('after') else 0)
+            )
+            
+            values = dict(search_params)
+            if mask & _DEPARTURE_DATE:
+                # Only the date part counts, so date-time strings are accepted too
+                try:
+                    day_start = datetime.fromisoformat(str(search_params['departure_date'])[:10])
+                except ValueError:
+                    raise ValueError(f"Invalid departure_date: {search_params['departure_date']}")
+                if hours:
+                    values['range_start'] = day_start + timedelta(hours=hours[0])
+                    values['range_end'] = day_start + timedelta(hours=hours[1] + 1)
+                else:
+                    values['range_start'] = day_start
+                    values['range_end'] = day_start + timedelta(days=1)
+            elif hours:
+                values['hour_start'], values['hour_end'] = hours
+            
+            if mask & _AFTER:
+                after = search_params['after']
+                if not isinstance(after, dict) or 'price' not in after or 'flight_id' not in after:
+                    raise ValueError("Invalid after cursor")
+                values['after_price'] = after['price']
+                values['after_flight_id'] = after['flight_id']
+            
+            name, prepare_sql, execute_sql, param_order = _SEARCH_QUERIES[mask]
+            params = [values[key] for key in param_order]
+            
+            def run_search(conn: _SearchConnection) -> List[Dict[str, Any]]:
+                cursor = conn.cursor()
+                
+                # Each connection parses and plans a shape once, on first use
+                if name not in conn.prepared_statements:
+                    cursor.execute(prepare_sql)
+                    conn.prepared_statements.add(name)
+                cursor.execute(execute_sql, params)
                 
-                # Calculate Chilean tax (IVA 19%)
-                if flight['pricing']['economy']:
-                    flight['pricing']['economy_with_tax'] = flight['pricing']['economy'] * 1.19
+                # Every value is final as fetched, so each row maps straight
+                # onto the flat response fields
+                rows = [dict(zip(_SEARCH_FIELDS, row)) for row in cursor]
                 
-                flights.append(flight)
+                cursor.close()
+                return rows
             
-            cursor.close()
+            flights = _run_pooled(run_search)
             logger.info(f"Found {len(flights)} flights for search parameters")
             
+            _cache_set(cache_key, SEARCH_CACHE_TTL, flights)
             return flights
             
         except Exception as e:
@@ -238,48 +615,50 @@ class FlightSearchService:
     def get_popular_routes(self) -> List[Dict[str, Any]]:
         """Get popular Chilean flight routes"""
         try:
-            conn = self.get_database_connection()
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT 
-                    dep.airport_code as from_airport,
-                    dep.city_name as from_city,
-                    arr.airport_code as to_airport,
-                    arr.city_name as to_city,
-                    COUNT(b.booking_id) as booking_count,
-                    AVG(fp.price_economy) as avg_price
-                FROM bookings b
-                JOIN flights f ON b.flight_id = f.flight_id
-                JOIN airports dep ON f.departure_airport_id = dep.airport_id
-                JOIN airports arr ON f.arrival_airport_id = arr.airport_id
-                JOIN flight_prices fp ON f.flight_id = fp.flight_id
-                WHERE b.booking_date >= NOW() - INTERVAL '30 days'
-                    AND b.booking_status != 'cancelled'
-                GROUP BY dep.airport_code, dep.city_name, arr.airport_code, arr.city_name
-                ORDER BY booking_count DESC
-                LIMIT 10
-            """
+            cached_routes = _cache_get('popular_routes')
+            if cached_routes is not None:
+                return cached_routes
             
-            cursor.execute(query)
-            results = cursor.fetchall()
+            def run_popular_routes(conn: _SearchConnection) -> List[Dict[str, Any]]:
+                cursor = conn.cursor()
+                
+                # Pre-aggregated hourly from bookings (see popular_routes_30d migration)
+                query = """
+                    SELECT 
+                        from_airport,
+                        from_city,
+                        to_airport,
+                        to_city,
+                        booking_count,
+                        avg_price::float8
+                    FROM popular_routes_30d
+                    ORDER BY booking_count DESC
+                    LIMIT 10
+                """
+                
+                cursor.execute(query)
+                
+                routes = []
+                for row in cursor:
+                    routes.append({
+                        'from': {
+                            'airport': row[0],
+                            'city': row[1]
+                        },
+                        'to': {
+                            'airport': row[2],
+                            'city': row[3]
+                        },
+                        'popularity_score': row[4],
+                        'average_price': row[5]
+                    })
+                
+                cursor.close()
+                return routes
             
-            routes = []
-            for row in results:
-                routes.append({
-                    'from': {
-                        'airport': row[0],
-                        'city': row[1]
-                    },
-                    'to': {
-                        'airport': row[2],
-                        'city': row[3]
-                    },
-                    'popularity_score': row[4],
-                    'average_price': float(row[5]) if row[5] else None
-                })
+            routes = _run_pooled(run_popular_routes)
             
-            cursor.close()
+            _cache_set('popular_routes', POPULAR_ROUTES_CACHE_TTL, routes)
             return routes
             
         except Exception as e:
@@ -289,55 +668,75 @@ class FlightSearchService:
     def get_price_trends(self, from_airport: str, to_airport: str) -> Dict[str, Any]:
         """Get price trends for a specific route"""
         try:
-            conn = self.get_database_connection()
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT 
-                    DATE(f.departure_time) as flight_date,
-                    AVG(fp.price_economy) as avg_price,
-                    MIN(fp.price_economy) as min_price,
-                    MAX(fp.price_economy) as max_price,
-                    COUNT(f.flight_id) as flight_count
-                FROM flights f
-                JOIN airports dep ON f.departure_airport_id = dep.airport_id
-                JOIN airports arr ON f.arrival_airport_id = arr.airport_id
-                JOIN flight_prices fp ON f.flight_id = fp.flight_id
-                WHERE dep.airport_code = %s
-                    AND arr.airport_code = %s
-                    AND f.departure_time >= NOW()
-                    AND f.departure_time <= NOW() + INTERVAL '90 days'
-                GROUP BY DATE(f.departure_time)
-                ORDER BY flight_date
-            """
-            
-            cursor.execute(query, (from_airport, to_airport))
-            results = cursor.fetchall()
-            
-            trends = {
-                'route': {
-                    'from': from_airport,
-                    'to': to_airport
-                },
-                'price_data': []
-            }
+            cache_key = f"price_trends:{from_airport}:{to_airport}"
+            cached_trends = _cache_get(cache_key)
+            if cached_trends is not None:
+                return cached_trends
+            
+            def run_price_trends(conn: _SearchConnection) -> Dict[str, Any]:
+                # One row per day of a 90-day window fits in a single fetch, so a
+                # plain client cursor is iterated directly
+                cursor = conn.cursor()
+                
+                query = """
+                    SELECT 
+                        DATE(f.departure_time) as flight_date,
+                        AVG(fp.price_economy)::float8 as avg_price,
+                        MIN(fp.price_economy)::float8 as min_price,
+                        MAX(fp.price_economy)::float8 as max_price,
+                        COUNT(f.flight_id) as flight_count
+                    FROM flights f
+                    JOIN airports dep ON f.departure_airport_id = dep.airport_id
+                    JOIN airports arr ON f.arrival_airport_id = arr.airport_id
+                    JOIN flight_prices fp ON f.flight_id = fp.flight_id
+                    WHERE dep.airport_code = %s
+                        AND arr.airport_code = %s
+                        AND f.departure_time >= NOW()
+                        AND f.departure_time <= NOW() + INTERVAL '90 days'
+                    GROUP BY DATE(f.departure_time)
+                    ORDER BY flight_date
+                """
+                
+                cursor.execute(query, (from_airport, to_airport))
+                
+                trends = {
+                    'route': {
+                        'from': from_airport,
+                        'to': to_airport
+                    },
+                    'price_data': []
+                }
+                
+                for row in cursor:
+                    trends['price_data'].append({
+                        'date': row[0],
+                        'average_price': row[1],
+                        'min_price': row[2],
+                        'max_price': row[3],
+                        'flight_count': row[4]
+                    })
+                
+                cursor.close()
+                return trends
             
-            for row in results:
-                trends['price_data'].append({
-                    'date': row[0].isoformat() if row[0] else None,
-                    'average_price': float(row[1]) if row[1] else None,
-                    'min_price': float(row[2]) if row[2] else None,
-                    'max_price': float(row[3]) if row[3] else None,
-                    'flight_count': row[4]
-                })
+            trends = _run_pooled(run_price_trends)
             
-            cursor.close()
+            _cache_set(cache_key, PRICE_TRENDS_CACHE_TTL, trends)
             return trends
             
         except Exception as e:
             logger.error(f"Error getting price trends: {str(e)}")
             return {}
 
+def _get_service() -> FlightSearchService:
+    """Return the container-wide flight search service"""
+    global _SERVICE
+    
+    if _SERVICE is None:
+        _SERVICE = FlightSearchService()
+    
+    return _SERVICE
+
 def lambda_handler(event, context):
     """
     Main Lambda handler for flight search
@@ -345,26 +744,43 @@ def lambda_handler(event, context):
     try:
         # Parse request
         if 'body' in event:
-            request_body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
+            request_body = orjson.loads(event['body']) if isinstance(event['body'], str) else event['body']
         else:
             request_body = event
         
-        # Initialize service
-        flight_service = FlightSearchService()
+        # Reuse the service across warm invocations
+        flight_service = _get_service()
         
         # Determine action
         action = request_body.get('action', 'search')
         
-        if action == 'search':
+        if action in ('search', 'search+popular'):
+            # Home-screen loads ask for popular routes alongside the search
+            popular_routes = None
+            if action == 'search+popular':
+                popular_routes = _EXECUTOR.submit(flight_service.get_popular_routes)
+            
             search_params = request_body.get('search_params', {})
             results = flight_service.search_flights(search_params)
             
             response_data = {
+                'schema_version': SEARCH_SCHEMA_VERSION,
                 'flights': results,
                 'search_params': search_params,
                 'total_results': len(results)
             }
             
+            # A full page may have more results; pass this back as search_params.after
+            if len(results) == SEARCH_PAGE_SIZE:
+                last_flight = results[-1]
+                response_data['next_cursor'] = {
+                    'price': last_flight['price_economy'],
+                    'flight_id': last_flight['flight_id']
+                }
+            
+            if popular_routes is not None:
+                response_data['popular_routes'] = popular_routes.result()
+            
         elif action == 'popular_routes':
             results = flight_service.get_popular_routes()
             response_data = {
@@ -392,7 +808,24 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
                 'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
             },
-            'body': json.dumps(response_data, default=str)
+            # orjson writes datetimes and dates natively as ISO 8601
+            'body': orjson.dumps(response_data, default=str, option=orjson.OPT_NAIVE_UTC).decode()
+        }
+        
+    except ValueError as e:
+        # Missing or malformed request parameters are the client's error
+        logger.warning(f"Invalid request: {str(e)}")
+        
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': orjson.dumps({
+                'error': 'Bad request',
+                'message': str(e)
+            }).decode()
         }
         
     except Exception as e:
@@ -404,8 +837,8 @@ def lambda_handler(event, context):
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({
+            'body': orjson.dumps({
                 'error': 'Internal server error',
                 'message': str(e) if os.environ.get('DEBUG') == 'true' else 'An error occurred processing your request'
-            })
+            }).decode()
         }
\ No newline at end of file
@@ -5,24 +5,151 @@ Integrates with Chilean payment system
 
 import json
 import boto3
-import requests
+import orjson
+import urllib3
 import hmac
 import hashlib
 import base64
-import uuid
-from datetime import datetime, timedelta
+import secrets
+from datetime import datetime, timedelta, timezone
 import logging
 import os
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Credentials are reused for 5 minutes, the same default TTL as the AWS
+# Parameters and Secrets Lambda Extension, so rotations are still picked up
+CREDENTIALS_TTL = 300
+
+# The AWS clients, parsed credentials and the payment service live at module
+# scope so warm invocations of the same execution environment reuse them
+_SECRETS = boto3.client('secretsmanager')
+_RDS_DATA = boto3.client('rds-data')
+_CREDENTIALS_CACHE: Dict[str, Tuple[float, Dict[str, str]]] = {}
+_SERVICE = None
+
+# Keep-alive connection pool so warm invocations reuse the TLS connection to
+# Transbank. Status retries are limited to GET: retrying a create (POST) or
+# confirm (PUT) after a gateway error could repeat a payment operation
+_HTTP = urllib3.PoolManager(
+    num_pools=2,
+    maxsize=8,
+    retries=urllib3.Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset(['GET'])
+    )
+)
+_HTTP_TIMEOUT = urllib3.Timeout(connect=3.05, read=27)
+
+# The NAT gateway drops flows idle for 350 s and answers a reused socket with
+# an RST, which POST/PUT can't be retried past. Pooled connections idle for
+# longer than this are discarded before the next call
+HTTP_IDLE_RESET = 300
+_HTTP_STATE = {'last_used': 0.0}
+
+# Worker threads for overlapping independent RDS Data API round-trips
+_POOL = ThreadPoolExecutor(max_workers=4)
+
+# Placeholders of the payment_transactions INSERT, in statement order, with
+# the Data API type hint of values sent as strings (None: inferred by value)
+_TRANSACTION_INSERT_FIELDS = (
+    ('buy_order', None),
+    ('token', None),
+    ('amount', None),
+    ('base_amount', None),
+    ('tax_amount', None),
+    ('flight_id', 'UUID'),
+    ('user_id', 'UUID'),
+    ('passenger_count', None),
+    ('status', None),
+    ('created_at', None)
+)
+
+# Fields read from a Transbank commit (confirmation) response
+_CONFIRM_FIELDS = (
+    'vci', 'amount', 'status', 'buy_order', 'session_id', 'card_detail',
+    'accounting_date', 'transaction_date', 'authorization_code',
+    'payment_type_code', 'response_code', 'installments_number'
+)
+
+# Payment status by Transbank (status, response_code). FAILED is rejected
+# whatever the response code; every other combination stays pending
+_PAYMENT_STATUS = {('AUTHORIZED', 0): 'approved'}
+
+# Transbank payment type codes
+_PAYMENT_TYPES = {
+    'VD': 'Tarjeta de Débito',
+    'VN': 'Tarjeta de Crédito',
+    'VC': 'Tarjeta de Crédito',
+    'SI': 'Sin Interés',
+    'S2': '2 cuotas sin interés',
+    'S3': '3 cuotas sin interés',
+    'N2': '2 cuotas con interés',
+    'N3': '3 cuotas con interés',
+    'N4': '4 cuotas con interés'
+}
+
+# Date part of buy orders and booking ids, reformatted once at local midnight
+_DATE_STAMP = {'expires_at': 0.0, 'value': ''}
+
+def _date_stamp() -> str:
+    """Return today's date as YYYYMMDD"""
+    now = time.time()
+    if now >= _DATE_STAMP['expires_at']:
+        today = datetime.fromtimestamp(now)
+        tomorrow = datetime.combine(today.date() + timedelta(days=1), datetime.min.time())
+        _DATE_STAMP['value'] = today.strftime('%Y%m%d')
+        _DATE_STAMP['expires_at'] = tomorrow.timestamp()
+    return _DATE_STAMP['value']
+
+def _rds_param(name: str, value: Any, type_hint: Optional[str] = None) -> Dict[str, Any]:
+    """Build a typed RDS Data API parameter so values are stored without casts"""
+    if value is None:
+        return {'name': name, 'value': {'isNull': True}}
+    # String-encoded types the Data API can't infer, such as UUID
+    if type_hint is not None:
+        return {'name': name, 'value': {'stringValue': str(value)}, 'typeHint': type_hint}
+    # bool is a subclass of int, so it has to be checked first
+    if isinstance(value, bool):
+        return {'name': name, 'value': {'booleanValue': value}}
+    if isinstance(value, int):
+        return {'name': name, 'value': {'longValue': value}}
+    if isinstance(value, float):
+        return {'name': name, 'value': {'doubleValue': value}}
+    if isinstance(value, datetime):
+        # The TIMESTAMP type hint expects 'YYYY-MM-DD HH:MM:SS[.FFF]'
+        return {
+            'name': name,
+            'value': {'stringValue': value.isoformat(sep=' ', timespec='milliseconds')},
+            'typeHint': 'TIMESTAMP'
+        }
+    return {'name': name, 'value': {'stringValue': str(value)}}
+
+def _transbank_timestamp(value: Optional[str]) -> Any:
+    """Parse a Transbank ISO 8601 timestamp (e.g. 2025-10-15T13:45:12.345Z) as naive UTC"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        # Stored as sent rather than failing an already committed payment
+        logger.warning("Unexpected Transbank timestamp format: %s", value)
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
 class TransbankPaymentService:
     def __init__(self):
         self.environment = os.environ.get('TRANSBANK_ENVIRONMENT', 'integration')
-        self.secrets_client = boto3.client('secretsmanager')
+        self.secrets_client = _SECRETS
         
         # Transbank URLs
         if self.environment == 'production':
@@ -30,68 +157,95 @@ class TransbankPaymentService:
         else:
             self.base_url = 'https://webpay3gint.transbank.cl'
         
-        # Get credentials
+        # Get credentials and the auth headers built from them
         self.credentials = self._get_transbank_credentials()
+        self._headers = self._build_headers(self.credentials)
         
         # Database connection for order management
-        self.db_client = boto3.client('rds-data')
+        self.db_client = _RDS_DATA
         self.db_cluster_arn = os.environ.get('DB_CLUSTER_ARN')
         self.db_secret_arn = os.environ.get('DB_SECRET_ARN')
         
     def _get_transbank_credentials(self) -> Dict[str, str]:
-        """Get Transbank credentials from AWS Secrets Manager"""
+        """Get Transbank credentials from AWS Secrets Manager, cached for CREDENTIALS_TTL seconds"""
+        secret_name = f"vuelachile/transbank-{self.environment}"
+        
+        cached = _CREDENTIALS_CACHE.get(secret_name)
+        if cached and time.monotonic() - cached[0] < CREDENTIALS_TTL:
+            return cached[1]
+        
         try:
-            secret_name = f"vuelachile/transbank-{self.environment}"
             response = self.secrets_client.get_secret_value(SecretId=secret_name)
-            return json.loads(response['SecretString'])
+            credentials = json.loads(response['SecretString'])
+            _CREDENTIALS_CACHE[secret_name] = (time.monotonic(), credentials)
+            return credentials
         except Exception as e:
-            logger.error(f"Error retrieving Transbank credentials: {str(e)}")
-            # Fallback to default test credentials for integration
+            logger.error("Error retrieving Transbank credentials: %s", e)
+            # Fallback to default test credentials for integration, cached like
+            # a fetched secret so warm calls don't retry the lookup every time
             if self.environment == 'integration':
-                return {
+                credentials = {
                     'commerce_code': '597055555532',
                     'api_key': '579B532A7440BB0C9079DED94D31EA1615BACEB56610332264630D42D0A36B1C'
                 }
+                _CREDENTIALS_CACHE[secret_name] = (time.monotonic(), credentials)
+                return credentials
             raise
     
+    @staticmethod
+    def _build_headers(credentials: Dict[str, str]) -> Dict[str, str]:
+        """Build the Transbank auth headers for a set of credentials"""
+        return {
+            'Tbk-Api-Key-Id': credentials['commerce_code'],
+            'Tbk-Api-Key-Secret': credentials['api_key'],
+            'Content-Type': 'application/json'
+        }
+    
     def create_payment_transaction(self, payment_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create a new payment transaction with Transbank
         """
         try:
             # Generate unique buy order
-            buy_order = f"VC-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+            buy_order = f"VC-{_date_stamp()}-{secrets.token_hex(4).upper()}"
             
-            # Calculate total amount (including Chilean IVA 19%)
-            base_amount = payment_data['amount']
-            tax_amount = base_amount * 0.19
-            total_amount = int(base_amount + tax_amount)  # Transbank requires integers
+            # Calculate total amount (including Chilean IVA 19%). CLP has no
+            # fractional units, so stay in integers end to end
+            base_amount = int(payment_data['amount'])
+            total_amount = (base_amount * 119) // 100  # Transbank requires integers
+            tax_amount = total_amount - base_amount
             
             # Prepare transaction data
             transaction_data = {
                 'buy_order': buy_order,
-                'session_id': payment_data.get('session_id', uuid.uuid4().hex),
+                'session_id': payment_data.get('session_id') or secrets.token_hex(16),
                 'amount': total_amount,
                 'return_url': payment_data.get('return_url', 'https://vuelachile.cl/payment/return')
             }
             
+            # Prepare the database record up front so only the token is
+            # left to fill in once Transbank answers
+            transaction_record = {
+                'buy_order': buy_order,
+                'token': None,
+                'amount': total_amount,
+                'base_amount': base_amount,
+                'tax_amount': tax_amount,
+                'flight_id': payment_data.get('flight_id'),
+                'user_id': payment_data.get('user_id'),
+                'passenger_count': payment_data.get('passenger_count', 1),
+                'status': 'pending',
+                # When the payment was started, before the Transbank round trip
+                'created_at': datetime.now(timezone.utc).replace(tzinfo=None)
+            }
+            
             # Create transaction with Transbank
             response = self._call_transbank_api('/rswebpaytransaction/api/webpay/v1.2/transactions', 'POST', transaction_data)
             
             if response.get('url') and response.get('token'):
                 # Store transaction in database
-                self._store_transaction({
-                    'buy_order': buy_order,
-                    'token': response['token'],
-                    'amount': total_amount,
-                    'base_amount': base_amount,
-                    'tax_amount': tax_amount,
-                    'flight_id': payment_data.get('flight_id'),
-                    'user_id': payment_data.get('user_id'),
-                    'passenger_count': payment_data.get('passenger_count', 1),
-                    'status': 'pending',
-                    'created_at': datetime.now().isoformat()
-                })
+                transaction_record['token'] = response['token']
+                self._store_transaction(transaction_record)
                 
                 return {
                     'success': True,
@@ -105,7 +259,7 @@ class TransbankPaymentService:
                 raise Exception(f"Invalid response from Transbank: {response}")
                 
         except Exception as e:
-            logger.error(f"Error creating Transbank transaction: {str(e)}")
+            logger.error("Error creating Transbank transaction: %s", e)
             return {
                 'success': False,
                 'error': str(e)
@@ -114,6 +268,10 @@ class TransbankPaymentService:
     def confirm_payment_transaction(self, token: str) -> Dict[str, Any]:
         """
         Confirm a payment transaction with Transbank
+        
+        Only the Transbank commit has to come first. The status update and
+        booking creation are independent and run concurrently on _POOL, so
+        the database side costs one round of RDS Data API calls.
         """
         try:
             # Get transaction status from Transbank
@@ -121,43 +279,46 @@ class TransbankPaymentService:
             
             if response:
                 # Parse response
-                vci = response.get('vci')
-                amount = response.get('amount')
-                status = response.get('status')
-                buy_order = response.get('buy_order')
-                session_id = response.get('session_id')
-                card_detail = response.get('card_detail', {})
-                accounting_date = response.get('accounting_date')
-                transaction_date = response.get('transaction_date')
-                authorization_code = response.get('authorization_code')
-                payment_type_code = response.get('payment_type_code')
-                response_code = response.get('response_code')
-                installments_number = response.get('installments_number')
+                (vci, amount, status, buy_order, session_id, card_detail,
+                 accounting_date, transaction_date, authorization_code,
+                 payment_type_code, response_code, installments_number) = map(response.get, _CONFIRM_FIELDS)
+                
+                # CLP amounts are whole pesos
+                if amount is not None:
+                    amount = int(amount)
                 
                 # Determine payment status
-                if status == 'AUTHORIZED' and response_code == 0:
-                    payment_status = 'approved'
-                elif status == 'FAILED':
+                if status == 'FAILED':
                     payment_status = 'rejected'
                 else:
-                    payment_status = 'pending'
+                    payment_status = _PAYMENT_STATUS.get((status, response_code), 'pending')
                 
-                # Update transaction in database
-                self._update_transaction(buy_order, {
-                    'status': payment_status,
-                    'authorization_code': authorization_code,
-                    'response_code': response_code,
-                    'transaction_date': transaction_date,
-                    'accounting_date': accounting_date,
-                    'card_number': card_detail.get('card_number'),
-                    'installments': installments_number,
-                    'payment_type': self._get_payment_type_description(payment_type_code),
-                    'confirmed_at': datetime.now().isoformat()
-                })
+                payment_type = self._get_payment_type_description(payment_type_code)
+                card_number = (card_detail or {}).get('card_number')
                 
-                # If payment approved, process booking
+                # If payment approved, process booking. It only reads columns
+                # written at creation, so it overlaps with the status update
+                booking = None
                 if payment_status == 'approved':
-                    self._process_successful_booking(buy_order)
+                    booking = _POOL.submit(self._process_successful_booking, buy_order)
+                
+                # Update transaction in database
+                try:
+                    self._update_transaction(buy_order, {
+                        'status': payment_status,
+                        'authorization_code': authorization_code,
+                        'response_code': response_code,
+                        'transaction_date': _transbank_timestamp(transaction_date),
+                        'accounting_date': accounting_date,
+                        'card_number': card_number,
+                        'installments': installments_number,
+                        'payment_type': payment_type
+                    }, now_columns=('confirmed_at',))
+                finally:
+                    # Lambda freezes the environment once the handler returns,
+                    # so the booking must finish within this invocation
+                    if booking is not None:
+                        booking.result()
                 
                 return {
                     'success': True,
@@ -166,8 +327,8 @@ class TransbankPaymentService:
                     'amount': amount,
                     'authorization_code': authorization_code,
                     'card_info': {
-                        'last_four': card_detail.get('card_number', '')[-4:] if card_detail.get('card_number') else None,
-                        'card_type': self._get_payment_type_description(payment_type_code)
+                        'last_four': card_number[-4:] if card_number else None,
+                        'card_type': payment_type
                     },
                     'transaction_date': transaction_date,
                     'installments': installments_number
@@ -176,7 +337,7 @@ class TransbankPaymentService:
                 raise Exception("No response from Transbank confirmation")
                 
         except Exception as e:
-            logger.error(f"Error confirming Transbank transaction: {str(e)}")
+            logger.error("Error confirming Transbank transaction: %s", e)
             return {
                 'success': False,
                 'error': str(e)
@@ -185,27 +346,33 @@ class TransbankPaymentService:
     def _call_transbank_api(self, endpoint: str, method: str, data: Optional[Dict] = None) -> Dict[str, Any]:
         """Make API call to Transbank"""
         try:
-            url = f"{self.base_url}{endpoint}"
-            headers = {
-                'Tbk-Api-Key-Id': self.credentials['commerce_code'],
-                'Tbk-Api-Key-Secret': self.credentials['api_key'],
-                'Content-Type': 'application/json'
-            }
+            # Served from the credentials cache; headers are only rebuilt when
+            # the TTL expires and a new credentials object is loaded
+            credentials = self._get_transbank_credentials()
+            if credentials is not self.credentials:
+                self.credentials = credentials
+                self._headers = self._build_headers(credentials)
             
-            if method == 'POST':
-                response = requests.post(url, headers=headers, json=data, timeout=30)
-            elif method == 'PUT':
-                response = requests.put(url, headers=headers, json=data, timeout=30)
-            elif method == 'GET':
-                response = requests.get(url, headers=headers, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+            if time.monotonic() - _HTTP_STATE['last_used'] > HTTP_IDLE_RESET:
+                _HTTP.clear()
             
-            response.raise_for_status()
-            return response.json()
+            try:
+                response = _HTTP.request(
+                    method,
+                    self.base_url + endpoint,
+                    body=orjson.dumps(data) if data is not None else None,
+                    headers=self._headers,
+                    timeout=_HTTP_TIMEOUT
+                )
+            finally:
+                _HTTP_STATE['last_used'] = time.monotonic()
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Transbank API request failed: {str(e)}")
+            if response.status >= 400:
+                raise urllib3.exceptions.HTTPError(f"{response.status} error from Transbank for {method} {endpoint}")
+            return orjson.loads(response.data)
+            
+        except urllib3.exceptions.HTTPError as e:
+            logger.error("Transbank API request failed: %s", e)
             raise
     
     def _store_transaction(self, transaction_data: Dict[str, Any]):
@@ -224,8 +391,8 @@ class TransbankPaymentService:
             """
             
             parameters = [
-                {'name': key, 'value': {'stringValue': str(value)} if value is not None else {'isNull': True}}
-                for key, value in transaction_data.items()
+                _rds_param(name, transaction_data[name], type_hint)
+                for name, type_hint in _TRANSACTION_INSERT_FIELDS
             ]
             
             self.db_client.execute_statement(
@@ -237,21 +404,18 @@ class TransbankPaymentService:
             )
             
         except Exception as e:
-            logger.error(f"Error storing transaction: {str(e)}")
+            logger.error("Error storing transaction: %s", e)
             raise
     
-    def _update_transaction(self, buy_order: str, update_data: Dict[str, Any]):
-        """Update transaction status"""
+    def _update_transaction(self, buy_order: str, update_data: Dict[str, Any], now_columns: Tuple[str, ...] = ()):
+        """Update transaction status, setting now_columns to the database clock"""
         try:
-            set_clauses = []
-            parameters = [{'name': 'buy_order', 'value': {'stringValue': buy_order}}]
+            set_clauses = [f"{column} = NOW()" for column in now_columns]
+            parameters = [_rds_param('buy_order', buy_order)]
             
             for key, value in update_data.items():
                 set_clauses.append(f"{key} = :{key}")
-                parameters.append({
-                    'name': key,
-                    'value': {'stringValue': str(value)} if value is not None else {'isNull': True}
-                })
+                parameters.append(_rds_param(key, value))
             
             sql = f"UPDATE payment_transactions SET {', '.join(set_clauses)} WHERE buy_order = :buy_order"
             
@@ -264,65 +428,48 @@ class TransbankPaymentService:
             )
             
         except Exception as e:
-            logger.error(f"Error updating transaction: {str(e)}")
+            logger.error("Error updating transaction: %s", e)
             raise
     
     def _process_successful_booking(self, buy_order: str):
         """Process successful booking after payment confirmation"""
         try:
-            # Get transaction details
-            sql_get = "SELECT * FROM payment_transactions WHERE buy_order = :buy_order"
+            booking_id = f"BK-{_date_stamp()}-{secrets.token_hex(4).upper()}"
+            
+            # Create booking record straight from the transaction row
+            sql_booking = """
+                INSERT INTO bookings (
+                    booking_id, flight_id, user_id, passenger_count,
+                    total_amount, payment_status, booking_status,
+                    payment_method, transaction_reference,
+                    booking_date, created_at
+                )
+                SELECT
+                    :booking_id, flight_id, user_id, passenger_count,
+                    amount, 'paid', 'confirmed',
+                    'transbank', buy_order,
+                    NOW(), NOW()
+                FROM payment_transactions
+                WHERE buy_order = :buy_order
+            """
             
             response = self.db_client.execute_statement(
                 resourceArn=self.db_cluster_arn,
                 secretArn=self.db_secret_arn,
                 database='vuelachile',
-                sql=sql_get,
-                parameters=[{'name': 'buy_order', 'value': {'stringValue': buy_order}}]
+                sql=sql_booking,
+                parameters=[
+                    _rds_param('booking_id', booking_id),
+                    _rds_param('buy_order', buy_order)
+                ]
             )
             
-            if response['records']:
-                transaction = response['records'][0]
-                
-                # Create booking record
-                booking_id = f"BK-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
-                
-                sql_booking = """
-                    INSERT INTO bookings (
-                        booking_id, flight_id, user_id, passenger_count,
-                        total_amount, payment_status, booking_status,
-                        payment_method, transaction_reference,
-                        booking_date, created_at
-                    ) VALUES (
-                        :booking_id, :flight_id, :user_id, :passenger_count,
-                        :total_amount, 'paid', 'confirmed',
-                        'transbank', :buy_order,
-                        NOW(), NOW()
-                    )
-                """
-                
-                booking_params = [
-                    {'name': 'booking_id', 'value': {'stringValue': booking_id}},
-                    {'name': 'flight_id', 'value': {'stringValue': str(transaction[4]['stringValue'])}},
-                    {'name': 'user_id', 'value': {'stringValue': str(transaction[5]['stringValue'])}},
-                    {'name': 'passenger_count', 'value': {'longValue': int(transaction[6]['stringValue'])}},
-                    {'name': 'total_amount', 'value': {'stringValue': str(transaction[2]['stringValue'])}},
-                    {'name': 'buy_order', 'value': {'stringValue': buy_order}}
-                ]
-                
-                self.db_client.execute_statement(
-                    resourceArn=self.db_cluster_arn,
-                    secretArn=self.db_secret_arn,
-                    database='vuelachile',
-                    sql=sql_booking,
-                    parameters=booking_params
-                )
-                
+            if response.get('numberOfRecordsUpdated'):
                 # Send confirmation email (integrate with SES)
                 self._send_booking_confirmation(booking_id)
                 
         except Exception as e:
-            logger.error(f"Error processing successful booking: {str(e)}")
+            logger.error("Error processing successful booking: %s", e)
             # Don't raise here to avoid blocking payment confirmation
     
     def _send_booking_confirmation(self, booking_id: str):
@@ -330,29 +477,27 @@ class TransbankPaymentService:
         try:
             # This would integrate with Amazon SES
             # For now, just log the action
-            logger.info(f"Booking confirmation would be sent for: {booking_id}")
+            logger.info("Booking confirmation would be sent for: %s", booking_id)
             
             # TODO: Implement SES email sending
             # ses_client = boto3.client('ses')
             # ses_client.send_email(...)
             
         except Exception as e:
-            logger.error(f"Error sending booking confirmation: {str(e)}")
+            logger.error("Error sending booking confirmation: %s", e)
     
     def _get_payment_type_description(self, payment_type_code: str) -> str:
         """Get payment type description from code"""
-        payment_types = {
-            'VD': 'Tarjeta de Débito',
-            'VN': 'Tarjeta de Crédito',
-            'VC': 'Tarjeta de Crédito',
-            'SI': 'Sin Interés',
-            'S2': '2 cuotas sin interés',
-            'S3': '3 cuotas sin interés',
-            'N2': '2 cuotas con interés',
-            'N3': '3 cuotas con interés',
-            'N4': '4 cuotas con interés'
-        }
-        return payment_types.get(payment_type_code, f'Tipo {payment_type_code}')
+        return _PAYMENT_TYPES.get(payment_type_code, f'Tipo {payment_type_code}')
+
+def _get_service() -> TransbankPaymentService:
+    """Return the container-wide payment service"""
+    global _SERVICE
+    
+    if _SERVICE is None:
+        _SERVICE = TransbankPaymentService()
+    
+    return _SERVICE
 
 def lambda_handler(event, context):
     """
@@ -361,12 +506,12 @@ def lambda_handler(event, context):
     try:
         # Parse request
         if 'body' in event:
-            request_body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
+            request_body = orjson.loads(event['body']) if isinstance(event['body'], str) else event['body']
         else:
             request_body = event
         
-        # Initialize payment service
-        payment_service = TransbankPaymentService()
+        # Reuse the payment service across warm invocations
+        payment_service = _get_service()
         
         # Determine action
         action = request_body.get('action', 'create')
@@ -395,11 +540,12 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
                 'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
             },
-            'body': json.dumps(result, default=str)
+            # Service results only hold str/int/None, so no default hook is needed
+            'body': orjson.dumps(result).decode()
         }
         
     except Exception as e:
-        logger.error(f"Payment processing error: {str(e)}")
+        logger.error("Payment processing error: %s", e)
         
         return {
             'statusCode': 500,
@@ -407,8 +553,8 @@ def lambda_handler(event, context):
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({
+            'body': orjson.dumps({
                 'success': False,
                 'error': str(e) if os.environ.get('DEBUG') == 'true' else 'Payment processing failed'
-            })
+            }).decode()
         }
\ No newline at end of file
@@ -0,0 +1,26 @@
+/*
+  # VuelaChile Database - Flight Search Ordering Index
+
+  Flight search returns results ordered by economy price with flight_id as a
+  tie-breaker, paginated with a keyset cursor on the same two columns.
+
+  ## Indexes Created:
+
+  1. **idx_flight_prices_economy** - (price_economy, flight_id) on flight_prices,
+     so the planner can walk prices in order and stop after one page instead of
+     sorting every matching row
+
+  The route/time side of search uses the index on flights(departure_airport_id,
+  arrival_airport_id, departure_time), idx_flights_route_time_covering since
+  20251015140000_flights_route_covering_index.sql replaced idx_flights_route_date.
+
+  ## Verification:
+
+  EXPLAIN (ANALYZE, BUFFERS) on a search should show Index Scan + Limit on
+  flight_prices instead of a Sort node.
+*/
+
+-- Flight prices - Search ordering and keyset pagination
+CREATE INDEX IF NOT EXISTS idx_flight_prices_economy ON flight_prices(price_economy, flight_id);
+
+ANALYZE flight_prices;
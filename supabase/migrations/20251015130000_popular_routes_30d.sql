@@ -0,0 +1,45 @@
+/*
+  # VuelaChile Database - Popular Routes Materialized View
+
+  The flight search Lambda lists the most booked routes of the last 30 days.
+  Aggregating bookings on every request scans and groups the whole 30-day
+  window, so the aggregate is materialized and refreshed hourly instead.
+
+  ## Objects Created:
+
+  1. **popular_routes_30d** - Bookings per route over the last 30 days with the
+     average economy price, excluding cancelled bookings
+  2. **idx_popular_routes_30d_route** - Unique index required by
+     REFRESH MATERIALIZED VIEW CONCURRENTLY
+  3. **refresh-popular-routes-30d** - Hourly pg_cron job refreshing the view
+     without blocking readers
+*/
+
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+
+-- Popular routes over the last 30 days
+CREATE MATERIALIZED VIEW IF NOT EXISTS popular_routes_30d AS
+SELECT
+    dep.airport_code as from_airport,
+    dep.city_name as from_city,
+    arr.airport_code as to_airport,
+    arr.city_name as to_city,
+    COUNT(b.booking_id) as booking_count,
+    AVG(fp.price_economy) as avg_price
+FROM bookings b
+JOIN flights f ON b.flight_id = f.flight_id
+JOIN airports dep ON f.departure_airport_id = dep.airport_id
+JOIN airports arr ON f.arrival_airport_id = arr.airport_id
+JOIN flight_prices fp ON f.flight_id = fp.flight_id
+WHERE b.booking_date >= NOW() - INTERVAL '30 days'
+    AND b.booking_status != 'cancelled'
+GROUP BY dep.airport_code, dep.city_name, arr.airport_code, arr.city_name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_popular_routes_30d_route ON popular_routes_30d(from_airport, to_airport);
+
+-- Refresh hourly
+SELECT cron.schedule(
+    'refresh-popular-routes-30d',
+    '0 * * * *',
+    $$REFRESH MATERIALIZED VIEW CONCURRENTLY popular_routes_30d$$
+);
@@ -0,0 +1,37 @@
+/*
+  # VuelaChile Database - Covering Index for Flight Search
+
+  Flight search filters flights by route and departure time and reads a fixed
+  set of flight columns. Carrying those columns in the route/time index lets
+  Postgres answer the flights side of the search with an Index Only Scan,
+  skipping heap fetches.
+
+  ## Indexes Created:
+
+  1. **idx_flights_route_time_covering** - (departure_airport_id,
+     arrival_airport_id, departure_time) INCLUDE the columns read by search
+
+  ## Indexes Dropped:
+
+  1. **idx_flights_route_date** - Same key columns, superseded by the covering
+     index
+
+  ## Notes:
+
+  - Search reads the aircraft name from aircraft_types through
+    aircraft_type_id, which is why that key is included
+  - Index-only scans depend on an up-to-date visibility map; run
+    VACUUM ANALYZE flights after applying (VACUUM cannot run inside the
+    migration transaction)
+  - Verify with EXPLAIN that search plans show "Index Only Scan" on flights
+*/
+
+-- Flights - Covering index for route/time search
+CREATE INDEX IF NOT EXISTS idx_flights_route_time_covering
+    ON flights(departure_airport_id, arrival_airport_id, departure_time)
+    INCLUDE (flight_id, airline_id, flight_number, aircraft_type_id, arrival_time,
+             flight_duration, stops, available_seats, total_seats);
+
+DROP INDEX IF EXISTS idx_flights_route_date;
+
+ANALYZE flights;